@@ -0,0 +1,104 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Cython versions of the node/link extraction loops of map_converter.py.
+
+They do the same lookups as map_converter._extract_nodes and _extract_links,
+but read plain dicts through the C API instead of interpreted .get() calls.
+Other mappings (e.g. pysimdjson proxies) still go through .get(). Records are
+reported with the missing_key and record_repr helpers passed in by
+map_converter, so the error messages are built in one place.
+
+Build in place, next to map_converter.py, with:
+    cythonize -i fast_extract.pyx
+map_converter falls back to its pure Python loops when this module is not built.
+"""
+from sys import intern
+
+from cpython.dict cimport PyDict_GetItem
+from cpython.object cimport PyObject
+
+cdef inline object _get(object obj, object key):
+    """Equivalent of (obj or {}).get(key), with a C API fast path for dicts."""
+    cdef PyObject* value
+    if type(obj) is dict:
+        value = PyDict_GetItem(obj, key)
+        if value is NULL:
+            return None
+        return <object>value
+    if not obj:
+        return None
+    return obj.get(key)
+
+
+def extract_nodes(object nodes_data, object vertices, str file_path, dict report, object missing_key,
+                  object record_repr):
+    """
+    Appends the vertices of the parsed node records to the columns of vertices.
+    Incomplete records are reported in report['key_errors'], naming missing_key(node), and skipped.
+    """
+    cdef list key_errors = report["key_errors"]
+    cdef list unexpected_errors = report["unexpected_errors"]
+    cdef object node, node_id, type_actor, content, latitude, longitude
+    append_id, append_class_type, append_latitude, append_longitude = vertices.column_appenders()
+    for node in nodes_data:
+        try:
+            node_id = node.get("id")
+            type_actor = node.get("typeActor")
+            content = _get(_get(node, "data"), "content")
+            latitude = _get(content, "latitude")
+            longitude = _get(content, "longitude")
+            if node_id is None or type_actor is None or latitude is None or longitude is None:
+                key_errors.append(f"Key error '{missing_key(node)}' in node {node_id if node_id is not None else 'unknown ID'} in {file_path}")
+                continue
+
+            append_id(node_id)
+            append_class_type(intern(type_actor) if type(type_actor) is str else type_actor)
+            append_latitude(latitude)
+            append_longitude(longitude)
+        except Exception as e:
+            unexpected_errors.append(f"Unexpected error processing node in {file_path}: {e}. Node: {record_repr(node)}")
+
+
+def extract_links(object links_data, object edges, str file_path, dict report, object missing_key,
+                  object record_repr):
+    """
+    Appends the edges of the parsed link records to the columns of edges.
+    Incomplete or invalid records are reported in report['key_errors'], naming missing_key(link), and skipped.
+    """
+    cdef list key_errors = report["key_errors"]
+    cdef list unexpected_errors = report["unexpected_errors"]
+    cdef object link, content, dependencies, source_node_id, target_node_id, link_id, length_str
+    cdef double length_float
+    append_source_id, append_target_id, append_id, append_length = edges.column_appenders()
+    for link in links_data:
+        length_str = None
+        try:
+            content = _get(_get(link, "data"), "content")
+            source_node_id = _get(content, "from_node")
+            target_node_id = _get(content, "to_node")
+            if not source_node_id or not target_node_id:
+                # Fall back to 'dependencies' only when 'data.content' lacks an endpoint
+                dependencies = link.get("dependencies")
+                if not source_node_id:
+                    source_node_id = _get(_get(dependencies, "from_node"), "id")
+                if not target_node_id:
+                    target_node_id = _get(_get(dependencies, "to_node"), "id")
+            link_id = link.get("id")
+            length_str = _get(content, "length")
+            if link_id is None or length_str is None:
+                key_errors.append(f"Key error '{missing_key(link)}' in link {link_id if link_id is not None else 'unknown ID'} in {file_path}")
+                continue
+            length_float = length_str if type(length_str) is float else float(length_str)
+
+            if not source_node_id or not target_node_id:
+                key_errors.append(f"Could not find source or target node ID in link {link_id} in {file_path}.")
+                continue
+
+            append_source_id(source_node_id)
+            append_target_id(target_node_id)
+            append_id(link_id)
+            append_length(length_float)
+        except ValueError:
+            key_errors.append(f"Could not convert 'length' to float in link {link.get('id', 'unknown ID')} in {file_path}. Value: '{length_str}'")
+        except Exception as e:
+            unexpected_errors.append(f"Unexpected error processing link in {file_path}: {e}. Link: {record_repr(link)}")
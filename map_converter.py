@@ -1,8 +1,788 @@
 import json
+import mmap
 import os
 import argparse # Import the module for command-line arguments
+import functools
+import re
+from array import array
+from contextlib import contextmanager
+from itertools import islice
+from dataclasses import dataclass, field
+import shutil
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def convert_simulation_data(simulation_config_path, output_path, docker_path_prefix=None, host_path_prefix=None):
+try:
+    import orjson # Optional: much faster JSON parsing and serialization when installed
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson # Optional: lazy parsing, only the fields we read become Python objects
+except ImportError:
+    simdjson = None
+
+try:
+    import ijson # Optional: streaming parser for data files too large to parse at once
+except ImportError:
+    ijson = None
+
+try:
+    import fast_extract # Optional: Cython build of the extraction loops (see fast_extract.pyx)
+except ImportError:
+    fast_extract = None
+
+def _stdlib_json_loads(raw):
+    return json.loads(bytes(raw)) # The stdlib decoder does not accept memoryviews
+
+def _stdlib_json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+if orjson is not None:
+    _json_loads = orjson.loads # Accepts bytes and memoryviews directly
+
+    def _json_dumps(obj):
+        try:
+            return orjson.dumps(obj) # Returns compact UTF-8 bytes
+        except TypeError:
+            # e.g. integers beyond 64 bits (read by the stdlib parser), which only the stdlib encodes
+            return _stdlib_json_dumps(obj)
+else:
+    _json_loads = _stdlib_json_loads
+    _json_dumps = _stdlib_json_dumps
+
+if simdjson is not None:
+    # Reusing a single parser avoids re-allocating its internal buffers for every file.
+    # Note: it can only be reused once no proxy of the previous document is alive.
+    _simdjson_parser = simdjson.Parser()
+    _SIMDJSON_PROXY_TYPES = {simdjson.Object, simdjson.Array}
+    _JSON_LIST_TYPES = (list, simdjson.Array)
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError, ValueError) # simdjson raises ValueError subclasses
+else:
+    _simdjson_parser = None
+    _JSON_LIST_TYPES = (list,)
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+if ijson is not None:
+    _JSON_DECODE_ERRORS += (ijson.JSONError,)
+
+_STREAM_THRESHOLD = 256 << 20 # Data files larger than this are streamed record by record (needs ijson)
+_NDJSON_EXTENSIONS = (".ndjson", ".jsonl") # Data files holding one JSON record per line
+
+def _parse_data_file(raw):
+    """
+    Parses the raw bytes of a node/link data file.
+
+    With pysimdjson installed, the result is a lazy proxy: nested objects are only
+    materialized for the fields actually accessed. Otherwise a regular Python
+    object tree is returned.
+    """
+    global _simdjson_parser
+    if _simdjson_parser is not None:
+        try:
+            return _simdjson_parser.parse(raw)
+        except RuntimeError as e:
+            if str(e).startswith("BIGINT_ERROR"):
+                # Integers beyond 64 bits: the stdlib parser reads them exactly
+                return _stdlib_json_loads(raw)
+            # Proxies of the previous document are still referenced: leave them its parser
+            _simdjson_parser = simdjson.Parser()
+            return _parse_data_file(raw)
+    return _json_loads(raw)
+
+def _record_repr(record):
+    """
+    Returns a record as shown in error messages: pysimdjson proxies are converted to
+    regular Python objects, which print their content instead of the proxy's address.
+    """
+    if simdjson is not None and type(record) in _SIMDJSON_PROXY_TYPES:
+        return record.as_dict() if type(record) is simdjson.Object else record.as_list()
+    return record
+
+def _detach_proxies(column):
+    """
+    Replaces the pysimdjson proxies of a column (field values that are JSON objects or
+    arrays) with regular Python objects, in place, so they outlive their document and
+    can be pickled and serialized.
+    """
+    if _SIMDJSON_PROXY_TYPES.isdisjoint(map(type, column)): # Scalars only: the common case
+        return
+    for index, value in enumerate(column):
+        if type(value) is simdjson.Object:
+            column[index] = value.as_dict()
+        elif type(value) is simdjson.Array:
+            column[index] = value.as_list()
+
+def _map_file(file_path):
+    """
+    Maps a file read-only into memory, hinting the kernel that it will be read
+    front to back. Returns None for empty files, which cannot be mapped.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        if os.fstat(fd).st_size == 0:
+            return None
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd) # The mapping stays valid after the descriptor is closed
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+def _starts_with_array(data_file):
+    """Checks whether a binary file's JSON document is an array, then rewinds it."""
+    head = data_file.read(4096).lstrip()
+    data_file.seek(0)
+    return head.startswith(b"[")
+
+@contextmanager
+def _open_records(file_path, file_size=None):
+    """
+    Opens a node/link data file and yields an iterable over its records, or None
+    if it does not hold a JSON list (file_size, when already known, saves a stat):
+      - '.ndjson'/'.jsonl' files are decoded one line at a time.
+      - Files larger than _STREAM_THRESHOLD are streamed from their top-level array
+        with ijson (when installed), so they never have to fit in memory at once.
+      - Anything else is parsed at once from a memory mapping.
+    """
+    if file_path.endswith(_NDJSON_EXTENSIONS):
+        with open(file_path, 'rb') as data_file:
+            yield (_json_loads(line) for line in data_file if not line.isspace())
+    elif ijson is not None and (os.path.getsize(file_path) if file_size is None else file_size) > _STREAM_THRESHOLD:
+        with open(file_path, 'rb') as data_file:
+            if _starts_with_array(data_file):
+                yield ijson.items(data_file, "item", use_float=True)
+            else:
+                yield None
+    else:
+        records = _load_data_file(file_path)
+        yield records if isinstance(records, _JSON_LIST_TYPES) else None
+
+def _load_data_file(file_path):
+    """
+    Parses a node/link data file straight from a memory mapping, avoiding the
+    intermediate copy of a buffered read().
+    """
+    mm = _map_file(file_path)
+    if mm is None:
+        return _parse_data_file(b"") # Let the parser report the empty document
+    try:
+        with memoryview(mm) as view:
+            return _parse_data_file(view)
+    finally:
+        mm.close()
+
+@dataclass
+class Vertices:
+    """
+    Vertices of one node file, stored column-wise (struct of arrays) instead of one
+    dict per vertex. The GPSMap dicts are only built, one at a time, when written.
+    """
+    resource_id: str
+    ids: list = field(default_factory=list)
+    class_types: list = field(default_factory=list)
+    latitudes: list = field(default_factory=list) # Kept as found in the data (number or string)
+    longitudes: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column_appenders(self):
+        """
+        Returns the bound append methods of the (id, classType, latitude, longitude) columns,
+        so hot loops can fill the columns without a method call per record.
+        """
+        return self.ids.append, self.class_types.append, self.latitudes.append, self.longitudes.append
+
+    def detach_proxies(self):
+        """Converts pysimdjson proxies held in the columns into regular Python objects."""
+        for column in (self.ids, self.class_types, self.latitudes, self.longitudes):
+            _detach_proxies(column)
+
+    def clear(self):
+        """Empties the columns."""
+        for column in (self.ids, self.class_types, self.latitudes, self.longitudes):
+            column.clear()
+
+    def write_to(self, outfile, needs_separator):
+        """Writes the vertices as GPSMap node records. Returns whether a separator is needed next."""
+        return _write_json_items(outfile, self.records(), needs_separator)
+
+    def records(self):
+        """Yields the vertices as GPSMap node dicts."""
+        resource_id = self.resource_id
+        for vertex_id, class_type, latitude, longitude in zip(self.ids, self.class_types,
+                                                              self.latitudes, self.longitudes):
+            yield {
+                "id": vertex_id,
+                "classType": class_type,
+                "resourceId": resource_id, # Use the resource ID as shardId
+                "latitude": latitude,
+                "longitude": longitude
+            }
+
+@dataclass
+class Edges:
+    """
+    Edges of one link file, stored column-wise (struct of arrays). Resource ID and
+    class type are shared by every edge of the file, so they are stored only once.
+    """
+    resource_id: str
+    class_type: str
+    source_ids: list = field(default_factory=list)
+    target_ids: list = field(default_factory=list)
+    ids: list = field(default_factory=list)
+    lengths: array = field(default_factory=lambda: array('d'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column_appenders(self):
+        """
+        Returns the bound append methods of the (source_id, target_id, id, length) columns,
+        so hot loops can fill the columns without a method call per record.
+        """
+        return self.source_ids.append, self.target_ids.append, self.ids.append, self.lengths.append
+
+    def detach_proxies(self):
+        """Converts pysimdjson proxies held in the columns into regular Python objects."""
+        for column in (self.source_ids, self.target_ids, self.ids):
+            _detach_proxies(column)
+
+    def clear(self):
+        """Empties the columns."""
+        for column in (self.source_ids, self.target_ids, self.ids):
+            column.clear()
+        del self.lengths[:] # array has no clear()
+
+    def write_to(self, outfile, needs_separator):
+        """Writes the edges as GPSMap edge records. Returns whether a separator is needed next."""
+        return _write_json_items(outfile, self.records(), needs_separator)
+
+    def records(self):
+        """Yields the edges as GPSMap edge dicts."""
+        # The labels of a file only differ in 'id' and 'length': copying a pre-built template
+        # reuses its hashed keys and constant values instead of building each label from scratch
+        new_label = {
+            "id": None,
+            "resourceId": self.resource_id, # Use the resource ID as shardId
+            "classType": self.class_type,
+            "length": None
+        }.copy
+        for source_id, target_id, link_id, length in zip(self.source_ids, self.target_ids,
+                                                         self.ids, self.lengths):
+            label = new_label()
+            label["id"] = link_id
+            label["length"] = length # Store float length in label as well
+            yield {
+                "source_id": source_id,
+                "target_id": target_id,
+                "weight": length, # Use float length as weight
+                "label": label
+            }
+
+class DataFileChangedError(Exception):
+    """Raised when a data file no longer holds the array body located in it."""
+
+@dataclass
+class ArrayFragment:
+    """
+    The byte range [start, end) of a file holding the body of a JSON array of GPSMap
+    nodes/edges, copied into the output as is, without being decoded and re-encoded:
+      - Passthrough mode: the top-level array of a data file already holding GPSMap records.
+      - Streamed data files: a temporary spool file the records were written to as they
+        were read (removed once copied).
+    """
+    file_path: str = None
+    start: int = 0
+    end: int = 0
+    records: int = 0 # Number of records, when known (not counted in passthrough mode)
+    temporary: bool = False # Whether file_path is a spool file to remove once copied
+    size: int = None # File size and modification time when the array body was located
+    mtime_ns: int = None # (None for spool files, which nothing else writes to)
+
+    def __bool__(self):
+        return self.end > self.start
+
+    def __len__(self):
+        return self.records
+
+    def write_to(self, outfile, needs_separator):
+        """
+        Copies the array body into outfile. Returns whether a separator is needed next.
+        Raises DataFileChangedError, before writing anything, if the file was modified
+        or removed since it was located.
+        """
+        if not self:
+            return needs_separator
+        try:
+            if self.mtime_ns is not None:
+                file_stat = os.stat(self.file_path)
+                if (file_stat.st_size, file_stat.st_mtime_ns) != (self.size, self.mtime_ns):
+                    raise DataFileChangedError(f"Content of {self.file_path} changed after it was located")
+            mm = _map_file(self.file_path)
+        except OSError:
+            mm = None
+        if mm is None or len(mm) < self.end:
+            if mm is not None:
+                mm.close()
+            raise DataFileChangedError(f"Content of {self.file_path} changed after it was located")
+        try:
+            if needs_separator:
+                outfile.write(b",")
+            for chunk_start in range(self.start, self.end, _WRITE_CHUNK_SIZE):
+                outfile.write(mm[chunk_start:min(chunk_start + _WRITE_CHUNK_SIZE, self.end)])
+        finally:
+            mm.close()
+            if self.temporary:
+                _remove_file(self.file_path)
+        return True
+
+_NON_WHITESPACE = re.compile(rb"[^ \t\r\n]")
+
+def _locate_array_body(file_path):
+    """
+    Finds the body of the top-level JSON array of a data file by looking only at its
+    first '[' and last ']' (the records in between are not scanned, see _check_json_file).
+    The file's size and modification time are recorded, so later changes can be detected.
+
+    Returns:
+        ArrayFragment: The array body (empty for '[]'), or None if the file is not a JSON array.
+    """
+    file_stat = os.stat(file_path)
+    mm = _map_file(file_path)
+    if mm is None:
+        return None
+    try:
+        start = mm.find(b"[")
+        end = mm.rfind(b"]")
+        if start < 0 or end < start \
+                or _NON_WHITESPACE.search(mm, 0, start) or _NON_WHITESPACE.search(mm, end + 1):
+            return None
+        if not _NON_WHITESPACE.search(mm, start + 1, end):
+            return ArrayFragment(file_path)
+        return ArrayFragment(file_path, start + 1, end, size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns)
+    finally:
+        mm.close()
+
+def _check_json_file(file_path, file_size=None):
+    """
+    Parses a whole data file only to check that it is well-formed JSON, raising the
+    parser's decode error otherwise: passthrough mode splices the file into the output,
+    where a malformed shard would corrupt the whole GPSMap. Files larger than
+    _STREAM_THRESHOLD are checked with ijson (when installed), without loading them at once.
+    """
+    if ijson is not None and (os.path.getsize(file_path) if file_size is None else file_size) > _STREAM_THRESHOLD:
+        with open(file_path, 'rb') as data_file:
+            deque(ijson.parse(data_file), maxlen=0) # Only the parse errors matter
+    else:
+        _load_data_file(file_path)
+
+# Shared stand-in for missing nested objects, so lookups don't allocate a new {} each time.
+# Never mutate it.
+_EMPTY = {}
+
+# Key paths every record must provide, in the order they are checked
+_NODE_REQUIRED_KEYS = (("id",), ("typeActor",), ("data", "content", "latitude"), ("data", "content", "longitude"))
+_LINK_REQUIRED_KEYS = (("id",), ("data", "content", "length"))
+
+def _find_missing_key(record, key_paths):
+    """
+    Returns the first key along key_paths that is missing (or null) in record.
+    Only used to build error messages, once a record is known to be incomplete.
+    """
+    for key_path in key_paths:
+        value = record
+        for key in key_path:
+            value = value.get(key) if hasattr(value, "get") else None
+            if value is None:
+                return key
+    return None
+
+def _missing_node_key(node):
+    """Returns the first required key missing (or null) in a node record."""
+    return _find_missing_key(node, _NODE_REQUIRED_KEYS)
+
+def _missing_link_key(link):
+    """Returns the first required key missing (or null) in a link record."""
+    return _find_missing_key(link, _LINK_REQUIRED_KEYS)
+
+def _path_remapper(docker_path_prefix=None, host_path_prefix=None):
+    """
+    Builds the function mapping a path inside the Docker container to the host by replacing
+    its Docker prefix with the host prefix. The prefixes are checked, and the prefix length
+    computed, once here instead of on every call.
+
+    Returns:
+        callable: file_path -> (mapped_path, remapped), where remapped tells whether the
+        prefix was replaced. Paths without the prefix are returned as is.
+    """
+    if not (docker_path_prefix and host_path_prefix):
+        return lambda file_path: (file_path, False)
+    prefix_length = len(docker_path_prefix)
+
+    def remap_path(file_path):
+        if file_path.startswith(docker_path_prefix):
+            return host_path_prefix + file_path[prefix_length:], True
+        return file_path, False
+    return remap_path
+
+def _extract_nodes(nodes_data, vertices, file_path, report):
+    """
+    Appends the vertices of the parsed node records to the columns of vertices.
+    Incomplete records are reported in report['key_errors'] and skipped.
+    """
+    append_id, append_class_type, append_latitude, append_longitude = vertices.column_appenders()
+    for node in nodes_data:
+        try:
+            # Plain lookups and a branch: missing keys are expected to be rare,
+            # and raising/catching KeyError is far more expensive than a None check
+            node_id = node.get("id")
+            type_actor = node.get("typeActor")
+            content = (node.get("data") or _EMPTY).get("content") or _EMPTY # Walk the nested path only once
+            latitude = content.get("latitude")
+            longitude = content.get("longitude")
+            if node_id is None or type_actor is None or latitude is None or longitude is None:
+                missing_key = _missing_node_key(node)
+                err_msg = f"Key error '{missing_key}' in node {node_id if node_id is not None else 'unknown ID'} in {file_path}"
+                report["key_errors"].append(err_msg)
+                continue
+
+            append_id(node_id)
+            # Few distinct values repeated on every node
+            append_class_type(sys.intern(type_actor) if type(type_actor) is str else type_actor)
+            append_latitude(latitude)
+            append_longitude(longitude)
+        except Exception as e:
+             report["unexpected_errors"].append(f"Unexpected error processing node in {file_path}: {e}. Node: {_record_repr(node)}")
+
+def _extract_links(links_data, edges, file_path, report):
+    """
+    Appends the edges of the parsed link records to the columns of edges.
+    Incomplete or invalid records are reported in report['key_errors'] and skipped.
+    """
+    append_source_id, append_target_id, append_id, append_length = edges.column_appenders()
+    for link in links_data:
+        length_str = None
+        try:
+            content = (link.get("data") or _EMPTY).get("content") or _EMPTY
+            source_node_id = content.get("from_node")
+            target_node_id = content.get("to_node")
+            if not source_node_id or not target_node_id:
+                # Extract node IDs from 'dependencies' if 'data.content' doesn't have them
+                # (The example shows them in data.content, but having a fallback is good practice)
+                dependencies = link.get("dependencies") or _EMPTY
+                if not source_node_id:
+                    source_node_id = (dependencies.get("from_node") or _EMPTY).get("id")
+                if not target_node_id:
+                    target_node_id = (dependencies.get("to_node") or _EMPTY).get("id")
+            link_id = link.get("id")
+            length_str = content.get("length")
+            if link_id is None or length_str is None:
+                missing_key = _missing_link_key(link)
+                err_msg = f"Key error '{missing_key}' in link {link_id if link_id is not None else 'unknown ID'} in {file_path}"
+                report["key_errors"].append(err_msg)
+                continue
+            # JSON numbers usually arrive as float already; only strings/ints need converting
+            length_float = length_str if type(length_str) is float else float(length_str)
+
+            if not source_node_id or not target_node_id:
+                report["key_errors"].append(f"Could not find source or target node ID in link {link_id} in {file_path}.")
+                continue
+
+            append_source_id(source_node_id)
+            append_target_id(target_node_id)
+            append_id(link_id)
+            append_length(length_float)
+        except ValueError:
+             err_msg = f"Could not convert 'length' to float in link {link.get('id', 'unknown ID')} in {file_path}. Value: '{length_str}'"
+             report["key_errors"].append(err_msg) # Add to error log
+        except Exception as e:
+             report["unexpected_errors"].append(f"Unexpected error processing link in {file_path}: {e}. Link: {_record_repr(link)}")
+
+if fast_extract is not None:
+    # Same lookups in compiled code; records are reported with the same helpers
+    _extract_nodes = functools.partial(fast_extract.extract_nodes, missing_key=_missing_node_key,
+                                       record_repr=_record_repr)
+    _extract_links = functools.partial(fast_extract.extract_links, missing_key=_missing_link_key,
+                                       record_repr=_record_repr)
+
+def _is_valid_source(data_source_info):
+    """
+    Checks the shape of an 'actorsDataSources' entry, including that its 'path' (when
+    present) is a string. Missing 'id'/'path' values are reported when the entry is processed.
+    """
+    if not isinstance(data_source_info, dict) or not isinstance(data_source_info.get("classType", ""), str):
+        return False
+    data_source = data_source_info.get("dataSource", {})
+    if not isinstance(data_source, dict) or not isinstance(data_source.get("info", {}), dict):
+        return False
+    return isinstance(_source_path(data_source_info), (str, type(None)))
+
+def _source_path(data_source_info):
+    """Returns the data file path of an 'actorsDataSources' entry, as written in the configuration."""
+    source_details = data_source_info.get("dataSource", {}).get("info", {})
+    return source_details.get("path", None)
+
+@dataclass
+class DataSource:
+    """A validated 'actorsDataSources' entry, with its data file path already mapped to the host."""
+    info: dict # The entry as found in the configuration
+    file_path: str = None # Host path of the data file (None if the entry has no 'path')
+    remapped: bool = False # Whether file_path was mapped from a Docker path
+    size: int = None # Size of the data file in bytes, looked up once (None if it cannot be accessed)
+
+_PREFETCH_BUDGET = 1 << 30 # At most this many bytes are prefetched in total
+
+def _prefetch_files(data_sources):
+    """
+    Asks the kernel to start reading the data files in the background (POSIX_FADV_WILLNEED),
+    so the storage latency of each file overlaps with the parsing of the others instead of
+    being paid one file at a time. Does nothing where posix_fadvise is unavailable.
+
+    The sizes looked up when the sources were validated are reused, so no file is stat'ed
+    again here. Files larger than _STREAM_THRESHOLD are skipped: they may not fit in memory,
+    and reading them ahead would only evict the pages of the other files. For the same reason,
+    files are no longer prefetched once _PREFETCH_BUDGET bytes have been requested.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    budget = _PREFETCH_BUDGET
+    for data_source in data_sources:
+        size = data_source.size
+        if size is None or not 0 < size <= min(_STREAM_THRESHOLD, budget):
+            continue # Missing, empty, streamed, or over the remaining budget
+        budget -= size
+        try:
+            fd = os.open(data_source.file_path, os.O_RDONLY)
+        except OSError:
+            continue # Missing/unreadable files are reported when they are processed
+        try:
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass # Only a hint
+        finally:
+            os.close(fd)
+
+def _spool_records(records, batch, extract, file_path, report, spool_dir=None):
+    """
+    Extracts streamed records _WRITE_BATCH_RECORDS at a time, writing each chunk of batch
+    to a temporary spool file and emptying it, so memory stays bounded by the chunk size
+    instead of growing with the file. The spool file is removed if reading fails part-way.
+
+    Returns:
+        The spooled records as an ArrayFragment, or the empty batch if there were none.
+    """
+    fd, spool_path = tempfile.mkstemp(suffix=".spool", dir=spool_dir)
+    try:
+        with open(fd, 'wb') as spool:
+            needs_separator = False
+            total_records = 0
+            for chunk in iter(lambda: list(islice(records, _WRITE_BATCH_RECORDS)), []):
+                extract(chunk, batch, file_path, report)
+                total_records += len(batch)
+                needs_separator = batch.write_to(spool, needs_separator)
+                batch.clear()
+            size = spool.tell()
+    except BaseException:
+        _remove_file(spool_path)
+        raise
+    if not size:
+        _remove_file(spool_path)
+        return batch
+    return ArrayFragment(spool_path, 0, size, total_records, temporary=True)
+
+def _read_data_file(kind, file_path, original_file_path, batch, extract, report, passthrough=False,
+                    spool_dir=None, file_size=None, trust_input=False):
+    """
+    Reads one node/link data file and fills batch from its records with extract().
+    Streamed files are spooled to a temporary file in spool_dir instead, and returned as
+    an ArrayFragment. In passthrough mode, the file is only located (and, unless trust_input,
+    checked to be well-formed JSON) and returned as an ArrayFragment. Failures are recorded
+    in report; the records of a file that could not be read completely are dropped, as when
+    a whole file fails to parse.
+
+    Returns:
+        The batch holding the file's data (the given batch, or an ArrayFragment).
+    """
+    try:
+        if passthrough:
+            fragment = _locate_array_body(file_path)
+            if fragment is None:
+                report["warnings"].append(f"Content of {file_path} is not a JSON list. Skipping.")
+                return batch
+            if fragment and not trust_input:
+                _check_json_file(file_path, file_size)
+            return fragment
+
+        with _open_records(file_path, file_size) as records:
+            if records is None:
+               report["warnings"].append(f"Content of {file_path} is not a JSON list. Skipping.")
+               return batch
+
+            if not isinstance(records, _JSON_LIST_TYPES): # Streamed from the file
+                return _spool_records(records, batch, extract, file_path, report, spool_dir)
+            extract(records, batch, file_path, report)
+            if _simdjson_parser is not None:
+                batch.detach_proxies() # Non-scalar field values are still proxies into the document
+
+    except FileNotFoundError:
+        err_msg = f"{kind.capitalize()} file not found: '{file_path}' (Original: '{original_file_path}')"
+        report["files_not_found"].append(err_msg)
+    except _JSON_DECODE_ERRORS:
+        err_msg = f"Failed to decode JSON in {kind} file: '{file_path}'"
+        report["json_errors"].append(err_msg)
+        batch.clear() # Records read before the error (streamed files)
+    except Exception as e:
+        report["unexpected_errors"].append(f"Unexpected error processing {kind} file '{file_path}': {e}")
+        batch.clear()
+    return batch
+
+# Data file kinds, keyed on the last three components of the actor class type:
+# (kind used in messages, extraction loop, index of the batch it fills in (vertices, edges))
+_DATA_FILE_KINDS = {
+    "mobility.actor.Node": ("node", _extract_nodes, 0),
+    "mobility.actor.Link": ("link", _extract_links, 1)
+}
+
+def _actor_kind(class_type):
+    """Normalizes a class type for _DATA_FILE_KINDS, e.g. 'org.interscity.htc.model.mobility.actor.Node' -> 'mobility.actor.Node'."""
+    return ".".join(class_type.rsplit(".", 3)[-3:])
+
+def _process_source(data_source, verbose=False, passthrough=False, spool_dir=None, trust_input=False):
+    """
+    Processes a single entry of 'actorsDataSources'. Entries are independent of each
+    other, so this runs in a worker process and only returns picklable data.
+
+    Args:
+        data_source (DataSource): The data source entry from the configuration file, with its host path.
+        verbose (bool, optional): Whether to record path mapping and progress messages. Defaults to False.
+        passthrough (bool, optional): Whether the data file already holds GPSMap records, in which
+            case it is only located as an ArrayFragment instead of parsed. Defaults to False.
+        spool_dir (str, optional): Directory for the temporary files streamed data files are
+            spooled to. Defaults to None (the system temporary directory).
+        trust_input (bool, optional): In passthrough mode, whether to skip checking that the data
+            file is well-formed JSON. Defaults to False.
+
+    Returns:
+        tuple: (Vertices, Edges, report), where report maps 'node_files', 'link_files',
+        'files_not_found', 'json_errors', 'key_errors', 'unexpected_errors', 'warnings'
+        and 'log' to lists of messages/paths. Nothing is printed here: messages are
+        reported once by the caller, which keeps stdout out of the hot loops.
+    """
+    report = {
+        "node_files": [],
+        "link_files": [],
+        "files_not_found": [],
+        "json_errors": [],
+        "key_errors": [],
+        "unexpected_errors": [],
+        "warnings": [],
+        "log": []
+    }
+
+    data_source_info = data_source.info
+    class_type = data_source_info.get("classType", "")
+    resource_id = data_source_info.get("id", None) # This will be the shardId
+    original_file_path = _source_path(data_source_info) # Path as it is in the JSON
+    # Interned once per file: these are repeated on every vertex/edge written
+    class_type = sys.intern(class_type)
+    if isinstance(resource_id, str):
+        resource_id = sys.intern(resource_id)
+    vertices = Vertices(resource_id)
+    edges = Edges(resource_id, class_type)
+
+    if not resource_id or not original_file_path:
+        report["warnings"].append(f"Skipping entry in actorsDataSources without 'id' or 'path': {data_source_info}")
+        return vertices, edges, report
+
+    # --- Docker -> Host Path Mapping (resolved by the caller) ---
+    file_path = data_source.file_path
+    if verbose:
+        if data_source.remapped:
+            report["log"].append(f"Mapping: '{original_file_path}' -> '{file_path}'")
+        else:
+            report["log"].append(f"Using path as is: '{file_path}'")
+
+    # --- Dispatch on the actor type ---
+    data_file_kind = _DATA_FILE_KINDS.get(_actor_kind(class_type))
+    if data_file_kind is None:
+        # Ignore other class types
+        report["warnings"].append(f"Skipping unsupported actor type: {class_type} (File: {original_file_path})")
+        return vertices, edges, report
+
+    kind, extract, batch_index = data_file_kind
+    if verbose:
+        report["log"].append(f"--> Processing {kind} file: {file_path} (Shard ID: {resource_id})")
+    report[f"{kind}_files"].append(original_file_path) # Log the original path
+    batches = [vertices, edges]
+    batches[batch_index] = _read_data_file(kind, file_path, original_file_path, batches[batch_index], extract,
+                                           report, passthrough, spool_dir, data_source.size, trust_input)
+    return batches[0], batches[1], report
+
+_POOL_MIN_BYTES = 32 << 20 # Less data than this in total is parsed faster than worker processes start
+
+def _file_size(file_path):
+    """Returns the size of a file in bytes, or None if it cannot be accessed."""
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+def _run_sources(data_sources, worker, max_workers=None):
+    """
+    Yields the worker results for each data source, in configuration order.
+    Uses a process pool (parsing is CPU bound and holds the GIL) only when there are
+    several sources and enough data to pay for starting the workers. No more sources
+    than workers are in flight at once, so finished results do not pile up in memory
+    while the caller is still writing earlier ones.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(data_sources))
+    total_size = sum(data_source.size or 0 for data_source in data_sources)
+    if workers < 2 or total_size < _POOL_MIN_BYTES:
+        yield from map(worker, data_sources)
+        return
+    sources = iter(data_sources)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque(executor.submit(worker, data_source) for data_source in islice(sources, workers))
+        while in_flight:
+            result = in_flight.popleft().result()
+            for data_source in islice(sources, 1): # Refill the window before handing the result over
+                in_flight.append(executor.submit(worker, data_source))
+            yield result
+
+_WRITE_BATCH_RECORDS = 65536 # Records serialized per write() when streaming the output
+_WRITE_CHUNK_SIZE = 16 << 20 # Bytes per read/write when copying the spooled edges
+
+def _write_json_items(outfile, items, needs_separator):
+    """
+    Writes items to a binary file as comma separated JSON values (the body of a JSON array).
+    Items are serialized in batches, each encoded by a single dumps() call and written
+    with a single write(), which keeps memory bounded and the number of syscalls low.
+
+    Returns:
+        bool: Whether a separator is needed before the next item.
+    """
+    items = iter(items)
+    while True:
+        batch = list(islice(items, _WRITE_BATCH_RECORDS))
+        if not batch:
+            return needs_separator
+        if needs_separator:
+            outfile.write(b",")
+        outfile.write(memoryview(_json_dumps(batch))[1:-1]) # Strip the enclosing brackets without copying
+        needs_separator = True
+
+def _remove_file(file_path):
+    """Removes a file, ignoring it if it does not exist."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+def convert_simulation_data(simulation_config_path, output_path, docker_path_prefix=None, host_path_prefix=None,
+                            max_workers=None, verbose=False, passthrough=False, trust_input=False):
     """
     Reads a simulation configuration file, processes the specified node and link files,
     and generates a consolidated GPSMap.json file.
@@ -13,14 +793,26 @@ def convert_simulation_data(simulation_config_path, output_path, docker_path_pre
         output_path (str): The path where the GPSMap.json file will be saved.
         docker_path_prefix (str, optional): The path prefix inside the Docker container. Defaults to None.
         host_path_prefix (str, optional): The corresponding path prefix on the host system. Defaults to None.
+        max_workers (int, optional): Number of worker processes used to parse the data files.
+            Defaults to None (one per CPU).
+        verbose (bool, optional): Whether to report path mapping and per-file progress. Defaults to False.
+        passthrough (bool, optional): Whether the node/link files already contain GPSMap node/edge
+            records. Their array bodies are then copied into the output without being converted,
+            so no per-record validation is done and the records are not counted. Each file is
+            still parsed once to check that it is well-formed JSON. Defaults to False.
+        trust_input (bool, optional): In passthrough mode, skip that check and copy the files
+            unparsed. A malformed file then makes the output invalid. Defaults to False.
     """
-    all_vertices = []
-    all_edges = []
+    total_vertices = 0
+    total_edges = 0
+    processing_log = []
+    warnings = []
     node_files_processed = []
     link_files_processed = []
     files_not_found = []
     json_errors = []
     key_errors = []
+    unexpected_errors = []
 
     print(f"Reading configuration file: {simulation_config_path}")
     try:
@@ -39,133 +831,112 @@ def convert_simulation_data(simulation_config_path, output_path, docker_path_pre
     if "actorsDataSources" not in config:
         print("CRITICAL Error: Key 'actorsDataSources' not found in the configuration file.")
         return
+    if not isinstance(config["actorsDataSources"], list):
+        print("CRITICAL Error: 'actorsDataSources' in the configuration file is not a list.")
+        return
 
-    # --- Process each data source ---
-    for data_source_info in config.get("actorsDataSources", []):
-        class_type = data_source_info.get("classType", "")
-        resource_id = data_source_info.get("id", None) # This will be the shardId
-        source_details = data_source_info.get("dataSource", {}).get("info", {})
-        original_file_path = source_details.get("path", None) # Path as it is in the JSON
-
-        if not resource_id or not original_file_path:
-            print(f"Warning: Skipping entry in actorsDataSources without 'id' or 'path': {data_source_info}")
+    # --- Prepare the data sources ---
+    # Validate the entries and map their paths once here, so the workers can rely on them
+    remap_path = _path_remapper(docker_path_prefix, host_path_prefix)
+    data_sources = []
+    for data_source_info in config["actorsDataSources"]:
+        if not _is_valid_source(data_source_info):
+            warnings.append(f"Skipping malformed entry in actorsDataSources: {data_source_info}")
             continue
+        data_source = DataSource(data_source_info)
+        original_file_path = _source_path(data_source_info)
+        if original_file_path:
+            data_source.file_path, data_source.remapped = remap_path(original_file_path)
+            data_source.size = _file_size(data_source.file_path) # The only stat of the file in this process
+        data_sources.append(data_source)
+    _prefetch_files(data_sources)
 
-        # --- Docker -> Host Path Mapping ---
-        file_path = original_file_path
-        if docker_path_prefix and host_path_prefix and original_file_path.startswith(docker_path_prefix):
-            # Replace the Docker prefix with the Host prefix
-            # The '1' ensures only the first occurrence (the prefix) is replaced
-            file_path = original_file_path.replace(docker_path_prefix, host_path_prefix, 1)
-            print(f"Mapping: '{original_file_path}' -> '{file_path}'")
-        else:
-            # If no mapping is needed or the path doesn't start with the prefix, use it as is
-            print(f"Using path as is: '{file_path}'")
-            pass # Use file_path as read from config
-
-        # --- Processing Node Files ---
-        if "mobility.actor.Node" in class_type:
-            print(f"--> Processing node file: {file_path} (Shard ID: {resource_id})")
-            node_files_processed.append(original_file_path) # Log the original path
-            try:
-                with open(file_path, 'r', encoding='utf-8') as node_file:
-                    nodes_data = json.load(node_file)
-                    if not isinstance(nodes_data, list):
-                       print(f"  Warning: Content of {file_path} is not a JSON list. Skipping.")
-                       continue
-
-                    for node in nodes_data:
-                        try:
-                            vertex = {
-                                "id": node["id"],
-                                "classType": node["typeActor"],
-                                "resourceId": resource_id, # Use the resource ID as shardId
-                                "latitude": node["data"]["content"]["latitude"],
-                                "longitude": node["data"]["content"]["longitude"]
-                            }
-                            all_vertices.append(vertex)
-                        except KeyError as e:
-                            err_msg = f"Key error '{e}' in node {node.get('id', 'unknown ID')} in {file_path}"
-                            print(f"  {err_msg}")
-                            key_errors.append(err_msg)
-                        except Exception as e:
-                             print(f"  Unexpected error processing node in {file_path}: {e}. Node: {node}")
-
-            except FileNotFoundError:
-                err_msg = f"Node file not found: '{file_path}' (Original: '{original_file_path}')"
-                print(f"  Error: {err_msg}")
-                files_not_found.append(err_msg)
-            except json.JSONDecodeError:
-                err_msg = f"Failed to decode JSON in node file: '{file_path}'"
-                print(f"  Error: {err_msg}")
-                json_errors.append(err_msg)
-            except Exception as e:
-                print(f"  Unexpected error processing node file '{file_path}': {e}")
-
-        # --- Processing Link Files ---
-        elif "mobility.actor.Link" in class_type:
-            print(f"--> Processing link file: {file_path} (Shard ID: {resource_id})")
-            link_files_processed.append(original_file_path) # Log the original path
-            try:
-                with open(file_path, 'r', encoding='utf-8') as link_file:
-                    links_data = json.load(link_file)
-                    if not isinstance(links_data, list):
-                       print(f"  Warning: Content of {file_path} is not a JSON list. Skipping.")
-                       continue
-
-                    for link in links_data:
-                        try:
-                            # Extract node IDs from 'dependencies' if 'data.content' doesn't have them
-                            # (The example shows them in data.content, but having a fallback is good practice)
-                            source_node_id = link.get("data", {}).get("content", {}).get("from_node") \
-                                             or link.get("dependencies", {}).get("from_node", {}).get("id")
-                            target_node_id = link.get("data", {}).get("content", {}).get("to_node") \
-                                             or link.get("dependencies", {}).get("to_node", {}).get("id")
-                            link_id = link["id"]
-                            length_str = link["data"]["content"]["length"]
-                            length_float = float(length_str) # Convert to float
-
-                            if not source_node_id or not target_node_id:
-                                print(f"  Error: Could not find source or target node ID in link {link_id} in {file_path}.")
-                                continue
-
-                            edge = {
-                                "source_id": source_node_id,
-                                "target_id": target_node_id,
-                                "weight": length_float, # Use float length as weight
-                                "label": {
-                                    "id": link_id,
-                                    "resourceId": resource_id, # Use the resource ID as shardId
-                                    "classType": class_type,
-                                    "length": length_float # Store float length in label as well
-                                }
-                            }
-                            all_edges.append(edge)
-                        except KeyError as e:
-                            err_msg = f"Key error '{e}' in link {link.get('id', 'unknown ID')} in {file_path}"
-                            print(f"  {err_msg}")
-                            key_errors.append(err_msg)
-                        except ValueError:
-                             err_msg = f"Could not convert 'length' to float in link {link.get('id', 'unknown ID')} in {file_path}. Value: '{length_str}'"
-                             print(f"  Error: {err_msg}")
-                             key_errors.append(err_msg) # Add to error log
-                        except Exception as e:
-                             print(f"  Unexpected error processing link in {file_path}: {e}. Link: {link}")
-
-            except FileNotFoundError:
-                err_msg = f"Link file not found: '{file_path}' (Original: '{original_file_path}')"
-                print(f"  Error: {err_msg}")
-                files_not_found.append(err_msg)
-            except json.JSONDecodeError:
-                err_msg = f"Failed to decode JSON in link file: '{file_path}'"
-                print(f"  Error: {err_msg}")
-                json_errors.append(err_msg)
-            except Exception as e:
-                print(f"  Unexpected error processing link file '{file_path}': {e}")
-        else:
-            # Ignore other class types
-            print(f"Skipping unsupported actor type: {class_type} (File: {original_file_path})")
+    # --- Prepare the output file ---
+    # The GPSMap is streamed to a temporary file while the sources are processed,
+    # so the full node/edge lists never have to be held in memory at once.
+    output_dir = os.path.dirname(output_path)
+    try:
+        # Ensure the output directory exists
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            print(f"Output directory created: {output_dir}")
+        # Uniquely named, so concurrent runs writing the same output don't clobber each other.
+        # Created last, right before the block that removes it on failure.
+        fd, tmp_output_path = tempfile.mkstemp(prefix=os.path.basename(output_path) + ".",
+                                               suffix=".tmp", dir=output_dir or None)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.fchmod(fd, 0o666 & ~umask) # mkstemp creates the file as 0600; use the usual permissions
+        outfile = open(fd, 'wb')
+    except IOError as e:
+        print(f"\nCRITICAL Error: Could not write output file '{output_path}': {e}")
+        return
+
+    # --- Process each data source (in parallel) ---
+    try:
+        with outfile, tempfile.TemporaryDirectory(dir=output_dir or None) as spool_dir, \
+                tempfile.TemporaryFile(dir=spool_dir) as edges_spool:
+            worker = functools.partial(
+                _process_source,
+                verbose=verbose,
+                passthrough=passthrough,
+                spool_dir=spool_dir, # Streamed data files are spooled next to the output
+                trust_input=trust_input
+            )
+            # Nodes go straight to the output; edges are spooled until all nodes are written
+            outfile.write(b'{"directed":false,"nodes":[')
+            nodes_pending = edges_pending = False
+            for vertices, edges, report in _run_sources(data_sources, worker, max_workers):
+                try:
+                    nodes_pending = vertices.write_to(outfile, nodes_pending)
+                    edges_pending = edges.write_to(edges_spool, edges_pending)
+                except DataFileChangedError as e:
+                    report["warnings"].append(f"{e}. Skipping.")
+                if not passthrough:
+                    total_vertices += len(vertices)
+                    total_edges += len(edges)
+                node_files_processed.extend(report["node_files"])
+                link_files_processed.extend(report["link_files"])
+                files_not_found.extend(report["files_not_found"])
+                json_errors.extend(report["json_errors"])
+                key_errors.extend(report["key_errors"])
+                unexpected_errors.extend(report["unexpected_errors"])
+                warnings.extend(report["warnings"])
+                processing_log.extend(report["log"])
+            outfile.write(b'],"edges":[')
+            edges_spool.seek(0)
+            shutil.copyfileobj(edges_spool, outfile, _WRITE_CHUNK_SIZE)
+            outfile.write(b']}')
+    except IOError as e:
+        print(f"\nCRITICAL Error: Could not write output file '{output_path}': {e}")
+        _remove_file(tmp_output_path)
+        return
+    except Exception:
+        _remove_file(tmp_output_path)
+        raise
+
+    # --- Save the output file ---
+    # Done before printing the report, so a failure while printing (e.g. a closed pipe)
+    # cannot leave the temporary file behind.
+    # Nothing pending a separator means no record was written.
+    no_data = not nodes_pending and not edges_pending and bool(files_not_found or json_errors or key_errors)
+    save_error = None
+    if no_data:
+        _remove_file(tmp_output_path) # Don't create an empty file if there were critical errors
+    else:
+        try:
+            os.replace(tmp_output_path, output_path)
+        except IOError as e:
+            save_error = e
+            _remove_file(tmp_output_path)
 
+    # --- Processing Log (verbose only) ---
+    if processing_log:
+        print("\n--- Processing Log ---")
+        print("\n".join(processing_log))
+    if warnings:
+        print("\n--- Warnings ---")
+        print("\n".join(warnings))
 
     # --- Error Report ---
     if files_not_found:
@@ -180,40 +951,26 @@ def convert_simulation_data(simulation_config_path, output_path, docker_path_pre
         print("\n--- Errors: Missing or Invalid Keys in Data ---")
         for msg in key_errors:
             print(msg)
+    if unexpected_errors:
+        print("\n--- Errors: Unexpected ---")
+        for msg in unexpected_errors:
+            print(msg)
 
-    # --- Build the final GPSMap structure ---
-    gps_map_data = {
-        "nodes": all_vertices,
-        "edges": all_edges,
-        "directed": False # Set to false as per the example
-    }
-
-    # --- Save the output file ---
     print(f"\n--- Summary ---")
     print(f"Node files processed (original paths): {len(node_files_processed)}")
     print(f"Link files processed (original paths): {len(link_files_processed)}")
-    print(f"Total vertices generated: {len(all_vertices)}")
-    print(f"Total edges generated: {len(all_edges)}")
-
-    if not all_vertices and not all_edges and (files_not_found or json_errors or key_errors):
-         print("\nNo data was generated due to previous errors. Output file will not be created.")
-         return # Don't create an empty file if there were critical errors
-
-    try:
-        # Ensure the output directory exists
-        output_dir = os.path.dirname(output_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            print(f"Output directory created: {output_dir}")
+    if passthrough:
+        print("Total vertices/edges generated: not counted (passthrough)")
+    else:
+        print(f"Total vertices generated: {total_vertices}")
+        print(f"Total edges generated: {total_edges}")
 
-        with open(output_path, 'w', encoding='utf-8') as outfile:
-            # Use indent for pretty printing, ensure_ascii=False for non-ASCII chars if any
-            json.dump(gps_map_data, outfile, indent=4, ensure_ascii=False)
+    if no_data:
+        print("\nNo data was generated due to previous errors. Output file will not be created.")
+    elif save_error is not None:
+        print(f"\nCRITICAL Error: Could not write output file '{output_path}': {save_error}")
+    else:
         print(f"\nFile '{output_path}' generated successfully!")
-    except IOError as e:
-        print(f"\nCRITICAL Error: Could not write output file '{output_path}': {e}")
-    except Exception as e:
-        print(f"\nCRITICAL unexpected error saving output file: {e}")
 
 # --- Command Line Argument Setup ---
 if __name__ == "__main__":
@@ -245,12 +1002,42 @@ if __name__ == "__main__":
         metavar="HOST_PREFIX",
         help="The corresponding path prefix on the *host* system (e.g., /home/user/my_project/data/)."
     )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of worker processes used to parse the data files. Uses one per CPU if not set."
+    )
+    parser.add_argument(
+        "--passthrough",
+        action="store_true",
+        help="The node/link files already contain GPSMap node/edge records: "
+             "copy them into the output without converting them."
+    )
+    parser.add_argument(
+        "--trust-input",
+        dest="trust_input",
+        action="store_true",
+        help="With --passthrough, don't parse the files to check that they are well-formed JSON. "
+             "Faster, but a malformed file makes the output invalid."
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Report how each data file path was mapped and which files were processed."
+    )
 
     args = parser.parse_args()
 
     # Simple validation: if one prefix is provided, the other must be too
     if (args.docker_prefix and not args.host_prefix) or (not args.docker_prefix and args.host_prefix):
         parser.error("If you provide --docker-prefix, you must also provide --host-prefix, and vice-versa.")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.trust_input and not args.passthrough:
+        parser.error("--trust-input can only be used with --passthrough.")
 
     # Check if the configuration file exists
     if not os.path.exists(args.config_file):
@@ -262,5 +1049,9 @@ if __name__ == "__main__":
         args.config_file,
         args.output_file,
         args.docker_prefix,
-        args.host_prefix
+        args.host_prefix,
+        args.workers,
+        args.verbose,
+        args.passthrough,
+        args.trust_input
     )
\ No newline at end of file